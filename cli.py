@@ -4,23 +4,83 @@
 """
 
 import argparse
+import functools
 import json
+import math
 import mimetypes
 import os
+import re
+import selectors
 import shutil
 import subprocess
 import sys
+import threading
+import time
 import uuid
 import wave
 from typing import Any, Dict, Tuple
 from urllib.parse import urlparse
 
-import requests
+try:
+    import orjson
+except ImportError:  # orjson is an optional accelerator; fall back to the stdlib parser.
+    orjson = None
 
 import config
 
+# MultiTalk repo directory (this file's directory) and the interpreter/script prefix
+# of every generator invocation; both are fixed for the life of the process.
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+GENERATOR_COMMAND_PREFIX = (sys.executable, os.path.join(REPO_DIR, "generate_multitalk.py"))
+
+# Repo-relative Kokoro voices directory and the job fields TTS mode cannot do without.
+KOKORO_VOICES_DIR = "weights/Kokoro-82M/voices"
+TTS_REQUIRED_FIELDS = ("kokoro_voice", "speech_text")
+
 # Characters per second for speech duration estimation (matches app/services/eta_service.py)
-CHARS_PER_SECOND = 15.0
+CHARS_PER_SECOND = 15
+# Video frames per second.
+FPS = 25
+# frame_num must be 4n+1 within [MIN_FRAMES, MAX_FRAMES].
+MIN_FRAMES = 33  # 4*8 + 1
+MAX_FRAMES = 81  # 4*20 + 1
+# Streaming-mode frame budget; the flags are pre-stringified once since they never change.
+MAX_FRAMES_NUM = 2000
+MAX_FRAMES_NUM_FLAGS = ("--max_frames_num", str(MAX_FRAMES_NUM))
+
+# Avatar asset names: a JSON config or a .png/.jpg/.jpeg/.webp image (case-insensitive).
+AVATAR_ASSET_PATTERN = re.compile(r"\.(json|png|jpe?g|webp)\Z", re.IGNORECASE)
+
+# Subprocess output is forwarded in blocks of this size; the failure tail keeps at most
+# STREAM_TAIL_LINES lines out of the last STREAM_TAIL_BYTES bytes of output.
+STREAM_READ_SIZE = 1 << 16
+STREAM_TAIL_LINES = 200
+STREAM_TAIL_BYTES = 1 << 16
+# Largest payload handed to the generator through the pipe fallback (no memfd_create);
+# must stay below the pipe buffer size.
+PAYLOAD_PIPE_LIMIT = 16 * 1024
+# Seconds to wait for generator output before checking whether the child has exited.
+STREAM_POLL_INTERVAL = 0.5
+
+
+_http_session = None
+
+
+def _get_http_session():
+    """
+    @brief Return the shared HTTP session, importing ``requests`` on first use.
+    @details ``requests`` pulls in urllib3, idna, certifi and a charset detector, so it is
+             only imported when an audio URL actually has to be downloaded. The session
+             is reused so repeated downloads share pooled TCP/TLS connections.
+    @return Process-wide ``requests.Session``.
+    """
+
+    global _http_session
+    if _http_session is None:
+        import requests
+
+        _http_session = requests.Session()
+    return _http_session
 
 
 def _guess_audio_extension(audio_url: str, content_type: str | None) -> str:
@@ -45,20 +105,6 @@ def _guess_audio_extension(audio_url: str, content_type: str | None) -> str:
     return ".bin"
 
 
-def _estimate_speech_duration_seconds(speech_text: str) -> float | None:
-    """
-    @brief Estimate video duration in seconds from speech text using character count.
-    @param speech_text The speech text to estimate duration for.
-    @return Estimated duration in seconds, or None if speech_text is empty/missing.
-    """
-    if not speech_text or not isinstance(speech_text, str):
-        return None
-    
-    # Estimate duration: characters / characters_per_second
-    duration = len(speech_text) / CHARS_PER_SECOND
-    return duration
-
-
 def _estimate_audio_duration_seconds(audio_path: str) -> float | None:
     """
     @brief Estimate video duration in seconds from an input audio file.
@@ -88,6 +134,8 @@ def _download_audio_from_url(audio_url: str, download_dir: str) -> str:
     """
     @brief Download an audio asset from a URL into the working directory.
     @param audio_url Remote URL to download.
+    @details The body is streamed to disk in 1 MiB chunks and the response is closed
+             afterwards so its connection returns to the shared session pool.
     @param download_dir Directory where the downloaded file should be stored.
     @return Absolute path to the downloaded file.
     @throws RuntimeError when the download fails.
@@ -97,21 +145,28 @@ def _download_audio_from_url(audio_url: str, download_dir: str) -> str:
         raise RuntimeError("audio_url must not be empty")
 
     try:
-        response = requests.get(audio_url, stream=True, timeout=(10, 300))
+        response = _get_http_session().get(
+            audio_url, stream=True, timeout=(10, 300), allow_redirects=True
+        )
         response.raise_for_status()
     except Exception as exc:
         raise RuntimeError(f"Failed to download audio from {audio_url}: {exc}") from exc
 
-    extension = _guess_audio_extension(audio_url, response.headers.get("content-type"))
-    download_path = os.path.join(download_dir, f"downloaded_audio_{uuid.uuid4().hex}{extension}")
+    with response:
+        extension = _guess_audio_extension(audio_url, response.headers.get("content-type"))
+        download_path = os.path.join(
+            download_dir, f"downloaded_audio_{uuid.uuid4().hex}{extension}"
+        )
 
-    try:
-        with open(download_path, "wb") as handle:
-            for chunk in response.iter_content(chunk_size=1024 * 1024):
-                if chunk:
-                    handle.write(chunk)
-    except Exception as exc:
-        raise RuntimeError(f"Failed to write downloaded audio to {download_path}: {exc}") from exc
+        try:
+            with open(download_path, "wb") as handle:
+                for chunk in response.iter_content(chunk_size=1024 * 1024):
+                    if chunk:
+                        handle.write(chunk)
+        except Exception as exc:
+            raise RuntimeError(
+                f"Failed to write downloaded audio to {download_path}: {exc}"
+            ) from exc
 
     return download_path
 
@@ -190,43 +245,128 @@ def _resolve_input_audio_path(
     return _preprocess_audio_for_multitalk(downloaded_path, work_dir)
 
 
-def _run_command_streaming(command: list[str], cwd: str) -> None:
+def _run_command_streaming(
+    command: list[str],
+    cwd: str,
+    pass_fds: Tuple[int, ...] = (),
+    timeout: float | None = None,
+) -> None:
     """
     @brief Run a subprocess while streaming stdout/stderr to the current process.
+    @details Output is forwarded in raw 64 KiB blocks rather than per line. Only the last
+             64 KiB is retained, as bytes, and it is decoded only if the command fails.
+             The pipe is watched with a selector so the wrapper sleeps during silent
+             compute phases, notices a dead child without waiting for EOF, and can
+             enforce a wall-clock timeout.
     @param command Command list to execute.
     @param cwd Working directory for the subprocess.
-    @throws RuntimeError when the command exits non-zero.
+    @param pass_fds File descriptors the subprocess should inherit.
+    @param timeout Optional wall-clock limit in seconds; the child is killed when exceeded.
+    @throws RuntimeError when the command exits non-zero or times out.
     """
 
+    # No preexec_fn: that keeps CPython (3.10+) on its vfork() launch path, so the
+    # child does not pay for copying the wrapper's page tables. os.posix_spawn is not
+    # an option because it cannot chdir into cwd before Python 3.13.
     proc = subprocess.Popen(
         command,
         cwd=cwd,
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
-        text=True,
-        bufsize=1,
+        bufsize=0,
+        close_fds=True,
+        pass_fds=pass_fds,
     )
 
-    tail: list[str] = []
     assert proc.stdout is not None
-    for line in proc.stdout:
-        sys.stdout.write(line)
-        sys.stdout.flush()
-        tail.append(line)
-        if len(tail) > 200:
-            tail.pop(0)
+    fd = proc.stdout.fileno()
+    os.set_blocking(fd, True)
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    timed_out = False
+    tail_buf = bytearray()
+    tail_truncated = False
+    child_exited = False
+    with selectors.DefaultSelector() as selector:
+        selector.register(proc.stdout, selectors.EVENT_READ)
+        while True:
+            poll_interval = 0 if child_exited else STREAM_POLL_INTERVAL
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    timed_out = True
+                    proc.kill()
+                    break
+                poll_interval = min(poll_interval, remaining)
+            if not selector.select(timeout=poll_interval):
+                if child_exited:
+                    break
+                # Quiet pipe: once the child is gone, drain what it wrote before exiting
+                # (it may have printed a traceback after the select above) and then stop,
+                # even if a grandchild inherited the pipe and keeps it from reaching EOF.
+                child_exited = proc.poll() is not None
+                continue
+            chunk = os.read(fd, STREAM_READ_SIZE)
+            if not chunk:
+                break
+            sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+            tail_buf += chunk
+            if len(tail_buf) > STREAM_TAIL_BYTES:
+                del tail_buf[:-STREAM_TAIL_BYTES]
+                tail_truncated = True
+    proc.stdout.close()
 
     rc = proc.wait()
-    if rc != 0:
-        tail_text = "".join(tail).strip()
+    if rc != 0 or timed_out:
+        if tail_truncated:
+            # Trimming cuts at an arbitrary byte; drop the partial first line (and any
+            # split UTF-8 sequence in it) before decoding.
+            del tail_buf[: tail_buf.find(b"\n") + 1]
+        tail_lines = tail_buf.decode("utf-8", "replace").splitlines()
+        tail_text = "\n".join(tail_lines[-STREAM_TAIL_LINES:]).strip()
+        if timed_out:
+            raise RuntimeError(
+                f"multitalk generation timed out after {timeout} seconds. Last output:\n{tail_text}"
+            )
         raise RuntimeError(
             f"multitalk generation failed with exit code {rc}. Last output:\n{tail_text}"
         )
 
 
+def _run_generator_in_process(command: list[str], cwd: str) -> None:
+    """
+    @brief Run ``generate_multitalk`` inside the current interpreter instead of a subprocess.
+    @details Skips a second interpreter start-up and torch import. The generator's argv is
+             taken from the subprocess command (everything after the script path), and the
+             working directory is switched to ``cwd`` for the duration of the call because
+             the generator resolves ``weights/...`` relative to it. There is no crash
+             isolation, timeout or output tail in this mode.
+    @param command Generator command as built for ``_run_command_streaming``.
+    @param cwd Working directory for the generator.
+    @throws RuntimeError when generation fails.
+    """
+
+    import generate_multitalk
+
+    previous_cwd = os.getcwd()
+    os.chdir(cwd)
+    try:
+        generate_multitalk.generate(generate_multitalk._parse_args(command[2:]))
+    except (Exception, SystemExit) as exc:
+        raise RuntimeError(f"multitalk generation failed in-process: {exc!r}") from exc
+    finally:
+        os.chdir(previous_cwd)
+
+
+# (repo_dir, kokoro_dir) pairs whose Kokoro link is already in place in this process.
+_kokoro_links_verified: set[Tuple[str, str]] = set()
+
+
+@functools.lru_cache(maxsize=256)
 def _resolve_path(base_dir: str, path_value: str) -> str:
     """
     @brief Resolve a path relative to the multitalk repo if needed.
+    @details Results are memoized; the same few repo-relative paths are resolved many times per run.
     @param base_dir Base directory for relative resolution.
     @param path_value Path to resolve.
     @return Absolute path for the input value.
@@ -234,6 +374,7 @@ def _resolve_path(base_dir: str, path_value: str) -> str:
 
     if os.path.isabs(path_value):
         return path_value
+    # abspath only consults the cwd when base_dir itself is relative.
     return os.path.abspath(os.path.join(base_dir, path_value))
 
 
@@ -249,16 +390,28 @@ def _ensure_kokoro_weights(repo_dir: str) -> None:
     if not kokoro_dir:
         return
 
+    link_key = (repo_dir, kokoro_dir)
+    if link_key in _kokoro_links_verified:
+        return
+
     weights_dir = os.path.join(repo_dir, "weights")
-    os.makedirs(weights_dir, exist_ok=True)
     link_path = os.path.join(weights_dir, "Kokoro-82M")
 
-    if os.path.exists(link_path):
-        return
+    try:
+        os.mkdir(weights_dir)
+    except FileExistsError:
+        pass
+    except FileNotFoundError:
+        os.makedirs(weights_dir, exist_ok=True)
 
+    # Attempt the link directly; an existing entry surfaces as EEXIST without a separate stat.
     try:
         os.symlink(kokoro_dir, link_path)
-    except Exception:
+        _kokoro_links_verified.add(link_key)
+    except FileExistsError:
+        # Includes a dangling link, which os.path.exists would have reported as missing.
+        _kokoro_links_verified.add(link_key)
+    except OSError:
         # If symlinks are not permitted, fall back to doing nothing; the generator will error clearly.
         pass
 
@@ -277,18 +430,29 @@ def _select_avatar_assets(avatar_dir: str) -> Tuple[str, str]:
     if not os.path.isdir(avatar_dir):
         raise RuntimeError(f"Avatar directory not found: {avatar_dir}")
 
-    entries = sorted(os.listdir(avatar_dir))
-    json_path = ""
-    image_path = ""
-    for name in entries:
-        path = os.path.join(avatar_dir, name)
-        if os.path.isdir(path):
-            continue
-        lower = name.lower()
-        if lower.endswith(".json") and not json_path:
-            json_path = path
-        elif lower.endswith((".png", ".jpg", ".jpeg", ".webp")) and not image_path:
-            image_path = path
+    # Single unsorted pass keeping the lowest-named candidate of each kind; this matches
+    # picking the first match in sorted order without sorting the whole directory.
+    json_entry: os.DirEntry | None = None
+    image_entry: os.DirEntry | None = None
+    with os.scandir(avatar_dir) as it:
+        for entry in it:
+            match = AVATAR_ASSET_PATTERN.search(entry.name)
+            if match is None:
+                continue
+            is_json = match.group(1).lower() == "json"
+            current = json_entry if is_json else image_entry
+            if current is not None and entry.name >= current.name:
+                continue
+            # DirEntry.is_file() reuses the readdir type info instead of a stat per entry.
+            if not entry.is_file():
+                continue
+            if is_json:
+                json_entry = entry
+            else:
+                image_entry = entry
+
+    json_path = json_entry.path if json_entry is not None else ""
+    image_path = image_entry.path if image_entry is not None else ""
 
     if not json_path or not image_path:
         raise RuntimeError(
@@ -309,14 +473,24 @@ def _resolve_voice_path(preferred_voice: str | None, base_dir: str) -> str:
 
     if not preferred_voice:
         return _resolve_path(base_dir, config.TTS_VOICE)
+    return _resolve_named_voice_path(preferred_voice, base_dir)
+
+
+@functools.lru_cache(maxsize=64)
+def _resolve_named_voice_path(preferred_voice: str, base_dir: str) -> str:
+    """
+    @brief Memoized resolution of an explicit voice identifier for ``_resolve_voice_path``.
+    @param preferred_voice Non-empty voice path, filename, or bare voice name.
+    @param base_dir Base directory for relative path resolution (multitalk repo root).
+    @return Absolute path to the voice ``.pt`` file.
+    """
 
     # Already looks like a path (contains separator or ends with .pt)
     if "/" in preferred_voice or preferred_voice.endswith(".pt"):
         return _resolve_path(base_dir, preferred_voice)
 
     # Bare voice name → resolve inside the Kokoro voices directory.
-    voice_path = f"weights/Kokoro-82M/voices/{preferred_voice}.pt"
-    return _resolve_path(base_dir, voice_path)
+    return _resolve_path(base_dir, f"{KOKORO_VOICES_DIR}/{preferred_voice}.pt")
 
 
 def _build_input_from_template(
@@ -373,7 +547,7 @@ def _build_input_payload(
              - Otherwise resolves Kokoro voice and speech_text into tts_audio
     @param data Raw job data from the backend JSON file.
     @param base_dir Base directory for resolving paths (repo directory).
-    @param audio_path Optional local audio file path.
+    @param audio_path Optional local audio file path, already resolved to an absolute path.
     @return Payload dictionary ready for multitalk input_json.
     @throws RuntimeError when required fields are missing.
     """
@@ -385,62 +559,232 @@ def _build_input_payload(
     if not avatar_path:
         raise RuntimeError(f"Job data must contain 'avatar_path' field: {data}")
 
-    resolved_audio_path = audio_path or data.get("audio_path")
+    # audio_path arrives already resolved by _resolve_input_audio_path; only the
+    # raw job value still needs resolving.
+    resolved_audio_path = audio_path
+    if not resolved_audio_path and data.get("audio_path"):
+        resolved_audio_path = _resolve_path(base_dir, data["audio_path"])
     if resolved_audio_path:
         return {
             "prompt": prompt,
             "cond_image": _resolve_path(base_dir, avatar_path),
             "cond_audio": {
-                "person1": _resolve_path(base_dir, resolved_audio_path),
+                "person1": resolved_audio_path,
             },
         }
 
-    voice = data.get("kokoro_voice")
-    if not voice:
-        raise RuntimeError(f"Job data must contain 'kokoro_voice' field: {data}")
-
-    speech_text = data.get("speech_text")
-    if not speech_text:
-        raise RuntimeError(f"Job data must contain 'speech_text' field: {data}")
+    for field in TTS_REQUIRED_FIELDS:
+        if not data.get(field):
+            raise RuntimeError(f"Job data must contain '{field}' field: {data}")
 
-    # Build the payload in the expected format
-    payload = {
+    return {
         "prompt": prompt,
         "cond_image": _resolve_path(base_dir, avatar_path),
         "tts_audio": {
-            "text": speech_text,
-            "human1_voice": _resolve_path(base_dir, f"weights/Kokoro-82M/voices/{voice}.pt"),
+            "text": data["speech_text"],
+            "human1_voice": _resolve_path(
+                base_dir, f"{KOKORO_VOICES_DIR}/{data['kokoro_voice']}.pt"
+            ),
         },
         "cond_audio": {},
     }
-    
-    return payload
 
 
 def _load_json(path: str) -> Dict[str, Any]:
     """
     @brief Load JSON content from disk.
+    @details Uses orjson on the raw bytes when it is installed.
     @param path File path to read.
     @return Parsed JSON dictionary.
     @throws RuntimeError if JSON cannot be read.
     """
 
     try:
+        if orjson is not None:
+            with open(path, "rb") as handle:
+                return orjson.loads(handle.read())
         with open(path, "r", encoding="utf-8") as handle:
             return json.load(handle)
     except Exception as exc:
         raise RuntimeError(f"Failed to read JSON from {path}: {exc}") from exc
 
 
+def _encode_json(payload: Dict[str, Any]) -> bytes:
+    """
+    @brief Serialize a payload to UTF-8 JSON bytes.
+    @details Uses orjson when it is installed. The stdlib fallback is configured to emit
+             the same compact, non-ASCII-escaped document as orjson.
+    @param payload JSON-serializable dictionary.
+    @return Encoded JSON document.
+    """
+
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
 def _write_json(path: str, payload: Dict[str, Any]) -> None:
     """
     @brief Write JSON content to disk.
+    @details The payload is encoded to bytes once and written straight to the file
+             descriptor. No fsync is issued: the file is read back by the generator
+             and deleted with the work dir.
     @param path File path to write.
     @param payload JSON-serializable dictionary.
     """
 
-    with open(path, "w", encoding="utf-8") as handle:
-        json.dump(payload, handle)
+    payload_bytes = _encode_json(payload)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(payload_bytes)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+def _open_payload_fd(payload: Dict[str, Any]) -> int | None:
+    """
+    @brief Stage the generator payload in an anonymous in-memory file instead of on disk.
+    @details The generator opens ``--input_json`` by path, so the descriptor can be handed
+             over as ``/dev/fd/<fd>`` and the payload never touches the filesystem. Linux
+             uses ``memfd_create``; other POSIX systems fall back to a pipe, which must hold
+             the whole payload before the child starts and is therefore size-limited.
+    @param payload JSON-serializable dictionary.
+    @return Descriptor to pass to the generator, or None to use a file on disk.
+    """
+
+    if os.name != "posix":
+        return None
+
+    payload_bytes = _encode_json(payload)
+    if hasattr(os, "memfd_create"):
+        read_fd = write_fd = os.memfd_create("cond.json")
+    elif len(payload_bytes) <= PAYLOAD_PIPE_LIMIT:
+        read_fd, write_fd = os.pipe()
+    else:
+        return None
+
+    try:
+        view = memoryview(payload_bytes)
+        while view:
+            view = view[os.write(write_fd, view):]
+        if write_fd == read_fd:
+            os.lseek(read_fd, 0, os.SEEK_SET)
+    except BaseException:
+        os.close(read_fd)
+        raise
+    finally:
+        if write_fd != read_fd:
+            os.close(write_fd)
+    return read_fd
+
+
+def _cleanup_work_dir_async(work_dir: str) -> None:
+    """
+    @brief Remove the job working directory without blocking the caller.
+    @details The directory is first renamed to a unique sibling, synchronously, so a re-run
+             of the same job can recreate ``work_dir`` straight away without the pending
+             delete removing its files. On POSIX the renamed directory is then removed by a
+             spawned helper interpreter running in its own session with stdin/stdout/stderr
+             on ``/dev/null``, so neither the wrapper's exit nor a reader waiting for EOF on
+             its output waits for the delete. Spawning (rather than forking) keeps a
+             multi-threaded ``--in-process`` wrapper from being copied. Elsewhere, or if the
+             helper cannot be started, a non-daemon thread or an inline ``shutil.rmtree`` is
+             used instead. Removal errors are ignored via ``ignore_errors=True``.
+    @param work_dir Directory to delete.
+    """
+
+    doomed_dir = f"{work_dir}.deleting-{uuid.uuid4().hex}"
+    try:
+        os.rename(work_dir, doomed_dir)
+    except OSError:
+        # Missing or not renamable: delete in place, synchronously, so nothing is left
+        # pending against a path that may be reused.
+        shutil.rmtree(work_dir, ignore_errors=True)
+        return
+    work_dir = doomed_dir
+
+    if os.name == "posix":
+        try:
+            subprocess.Popen(
+                [
+                    sys.executable,
+                    "-c",
+                    "import shutil, sys; shutil.rmtree(sys.argv[1], ignore_errors=True)",
+                    work_dir,
+                ],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True,
+                close_fds=True,
+            )
+        except OSError:
+            # Could not spawn the helper (e.g. process limits): clean up inline instead.
+            shutil.rmtree(work_dir, ignore_errors=True)
+        return
+
+    threading.Thread(
+        target=shutil.rmtree,
+        args=(work_dir,),
+        kwargs={"ignore_errors": True},
+        daemon=False,
+    ).start()
+
+
+def _positive_seconds(value: str) -> float:
+    """
+    @brief ``argparse`` type for durations that must be a finite number above zero.
+    @param value Raw command-line value.
+    @return Parsed duration in seconds.
+    @throws argparse.ArgumentTypeError if the value is not a positive finite number.
+    """
+
+    try:
+        seconds = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid number of seconds: {value!r}") from None
+    if not math.isfinite(seconds) or seconds <= 0:
+        raise argparse.ArgumentTypeError(f"must be a positive number of seconds, got {value!r}")
+    return seconds
+
+
+_parser: argparse.ArgumentParser | None = None
+
+
+def _get_parser() -> argparse.ArgumentParser:
+    """
+    @brief Return the CLI argument parser, building it on first use.
+    @return Process-wide ``argparse.ArgumentParser`` for the wrapper flags.
+    """
+
+    global _parser
+    if _parser is None:
+        _parser = argparse.ArgumentParser(
+            description="Backend wrapper for MultiTalk generation",
+        )
+        _parser.add_argument("--job-id", required=True)
+        _parser.add_argument("--output", required=True)
+        _parser.add_argument("--data", required=True)
+        _parser.add_argument("--audio", default=None)
+        _parser.add_argument("--audio-url", default=None)
+        _parser.add_argument("--work-dir", default=None)
+        _parser.add_argument(
+            "--timeout",
+            type=_positive_seconds,
+            default=None,
+            help=(
+                "Kill the generator process if it runs longer than this many seconds. "
+                "Only the direct child is killed, not processes it has spawned."
+            ),
+        )
+        _parser.add_argument(
+            "--in-process",
+            action="store_true",
+            help="Import and run generate_multitalk in this interpreter instead of a subprocess.",
+        )
+    return _parser
 
 
 def main() -> None:
@@ -449,29 +793,42 @@ def main() -> None:
     @throws RuntimeError on invalid input or generation failure.
     """
 
-    parser = argparse.ArgumentParser(
-        description="Backend wrapper for MultiTalk generation",
-    )
-    parser.add_argument("--job-id", required=True)
-    parser.add_argument("--output", required=True)
-    parser.add_argument("--data", required=True)
-    parser.add_argument("--audio", default=None)
-    parser.add_argument("--audio-url", default=None)
-    parser.add_argument("--work-dir", default=None)
+    parser = _get_parser()
     args = parser.parse_args()
+    if args.in_process and args.timeout is not None:
+        parser.error("--timeout is only supported when the generator runs as a subprocess")
 
-    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    repo_dir = REPO_DIR
     
     work_dir = args.work_dir
     if work_dir is None:
         print('WARNING: no --work-dir specified, using default "backend_runs/{job_id}"')
         work_dir = os.path.join(repo_dir, "backend_runs", args.job_id)
+    # The generator runs with cwd=repo_dir, so every path derived from work_dir must be absolute.
+    work_dir = os.path.abspath(work_dir)
     os.makedirs(work_dir, exist_ok=True)
 
     input_json_path = os.path.join(work_dir, f"cond.json")
     audio_save_dir = os.path.join(work_dir, "audio")
 
     data = _load_json(args.data)
+
+    # Validate the local model paths before any network download so config errors fail fast.
+    ckpt_dir = config.CKPT_DIR
+    wav2vec_dir = config.WAV2VEC_DIR
+    if not ckpt_dir or not wav2vec_dir:
+        raise RuntimeError("Missing CKPT_DIR or WAV2VEC_DIR in config.py")
+
+    ckpt_dir = _resolve_path(repo_dir, ckpt_dir)
+    wav2vec_dir = _resolve_path(repo_dir, wav2vec_dir)
+
+    lora_path = None
+    lora_dir = data.get("lora_dir", getattr(config, "LORA_DIR", "") or "")
+    if str(lora_dir).strip():
+        lora_path = _resolve_path(repo_dir, str(lora_dir).strip())
+        if not os.path.isfile(lora_path):
+            raise RuntimeError(f"LoRA weights not found: {lora_path}")
+
     resolved_audio_path = _resolve_input_audio_path(
         base_dir=repo_dir,
         work_dir=work_dir,
@@ -479,55 +836,35 @@ def main() -> None:
         audio_path=args.audio,
         audio_url=args.audio_url,
     )
+
     payload = _build_input_payload(
         data=data,
         base_dir=repo_dir,
         audio_path=resolved_audio_path,
     )
-    _write_json(input_json_path, payload)
     audio_mode = "localfile" if payload.get("cond_audio") else "tts"
 
-    ckpt_dir = config.CKPT_DIR
-    wav2vec_dir = config.WAV2VEC_DIR
-    if not ckpt_dir or not wav2vec_dir:
-        raise RuntimeError("Missing CKPT_DIR or WAV2VEC_DIR in config.py")
-
-    ckpt_dir = _resolve_path(repo_dir, ckpt_dir)
-    wav2vec_dir = _resolve_path(repo_dir, wav2vec_dir)
-
     if audio_mode == "tts":
         _ensure_kokoro_weights(repo_dir)
 
     # Calculate frame_num and max_frames_num based on video duration
-    FPS = 25.0  # Video frames per second
     frames_estimated: int | None = None
     if audio_mode == "localfile":
         input_audio_path = payload["cond_audio"]["person1"]
         video_duration_seconds = _estimate_audio_duration_seconds(input_audio_path)
+        if video_duration_seconds is not None:
+            frames_estimated = int(video_duration_seconds * FPS)
     else:
-        speech_text = data.get("speech_text", "")
-        video_duration_seconds = (
-            _estimate_speech_duration_seconds(speech_text) if speech_text else None
-        )
+        # _build_input_payload guarantees non-empty TTS text.
+        # chars / CHARS_PER_SECOND seconds * FPS, kept in integer arithmetic.
+        frames_estimated = len(payload["tts_audio"]["text"]) * FPS // CHARS_PER_SECOND
 
     # Choose the largest safe frame_num for this text, with safety margin.
-    # Keep it in [33, 81] and enforce frame_num = 4n+1.
-    MIN_FRAMES = 33   # 4*8 + 1
-    MAX_FRAMES = 81   # 4*20 + 1
-
-    if video_duration_seconds is not None:
-        # Estimated frames for the (TTS) audio, with a small safety margin
-        frames_estimated = int(video_duration_seconds * FPS)
-        frames_target = int(frames_estimated * 0.9) # 10% safety margin
-
-        # Clamp into [MIN_FRAMES, MAX_FRAMES]
-        frames_target = max(MIN_FRAMES, min(MAX_FRAMES, frames_target))
-
-        # frame_num must be 4n+1 -> round DOWN to nearest 4n+1 <= frames_target
-        remainder = (frames_target - 1) % 4
-        frame_num = frames_target - remainder
-        if frame_num < MIN_FRAMES:
-            frame_num = MIN_FRAMES
+    # Keep it in [MIN_FRAMES, MAX_FRAMES] and enforce frame_num = 4n+1.
+    if frames_estimated is not None:
+        frames_target = frames_estimated * 9 // 10  # 10% safety margin
+        # Round DOWN to the nearest 4n+1 (clear the low two bits of n-1), then clamp.
+        frame_num = max(MIN_FRAMES, min(MAX_FRAMES, ((frames_target - 1) & ~3) + 1))
     else:
         # Unknown duration: fall back to the most conservative (max) clip length
         frame_num = MAX_FRAMES
@@ -549,21 +886,30 @@ def main() -> None:
     #             max_frames_num = max_frames_num + (4 - remainder)
     #     else:
     #         max_frames_num = 1000  # default for streaming when duration unknown
-    max_frames_num = 2000
+    max_frames_num = MAX_FRAMES_NUM
 
     if frames_estimated is not None and frames_estimated > max_frames_num:
         raise RuntimeError(f"Estimated frames {frames_estimated} is greater than max_frames_num {max_frames_num}. "
                             "Max runtime will be exceeded")
 
+    # Hand the payload to the generator in memory; fall back to cond.json in work_dir.
+    payload_fd = _open_payload_fd(payload)
+    if payload_fd is None:
+        _write_json(input_json_path, payload)
+        input_json_arg = input_json_path
+        pass_fds: Tuple[int, ...] = ()
+    else:
+        input_json_arg = f"/dev/fd/{payload_fd}"
+        pass_fds = (payload_fd,)
+
     command = [
-        sys.executable,
-        os.path.join(repo_dir, "generate_multitalk.py"),
+        *GENERATOR_COMMAND_PREFIX,
         "--ckpt_dir",
         ckpt_dir,
         "--wav2vec_dir",
         wav2vec_dir,
         "--input_json",
-        input_json_path,
+        input_json_arg,
         "--sample_steps",
         str(data.get("sample_steps", getattr(config, "SAMPLE_STEPS", 40))),
         "--mode",
@@ -582,7 +928,7 @@ def main() -> None:
 
     # Add max_frames_num argument for streaming mode
     if mode == "streaming":
-        command.extend(["--max_frames_num", str(max_frames_num)])
+        command.extend(MAX_FRAMES_NUM_FLAGS)
 
     use_teacache = data.get(
         "use_teacache",
@@ -592,11 +938,7 @@ def main() -> None:
         command.append("--use_teacache")
 
     # FusionX LoRA: 12 steps, text CFG 1.0, audio CFG 5.0 (stronger lip sync; no TeaCache).
-    lora_dir = data.get("lora_dir", getattr(config, "LORA_DIR", "") or "")
-    if str(lora_dir).strip():
-        lora_path = _resolve_path(repo_dir, str(lora_dir).strip())
-        if not os.path.isfile(lora_path):
-            raise RuntimeError(f"LoRA weights not found: {lora_path}")
+    if lora_path:
         command.extend(
             [
                 "--lora_dir",
@@ -623,13 +965,19 @@ def main() -> None:
         )
 
     try:
-        _run_command_streaming(command, cwd=repo_dir)
+        if args.in_process:
+            _run_generator_in_process(command, cwd=repo_dir)
+        else:
+            _run_command_streaming(
+                command, cwd=repo_dir, pass_fds=pass_fds, timeout=args.timeout
+            )
     finally:
-        try:
-            shutil.rmtree(work_dir)
-            # print(f"Skipping cleanup of work_dir: {work_dir}\n command ran \n {command}")
-        except Exception:
-            pass
+        if payload_fd is not None:
+            os.close(payload_fd)
+        # Renames work_dir synchronously before deleting it in the background, so a
+        # re-run of the same job id can reuse the path as soon as this returns.
+        _cleanup_work_dir_async(work_dir)
+        # print(f"Skipping cleanup of work_dir: {work_dir}\n command ran \n {command}")
 
 
 if __name__ == "__main__":
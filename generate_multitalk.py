@@ -59,7 +59,7 @@ def _validate_args(args):
         task], f"Unsupport size {args.size} for task {args.task}, supported sizes are: {', '.join(SUPPORTED_SIZES[args.task])}"
 
 
-def _parse_args():
+def _parse_args(argv=None):
     parser = argparse.ArgumentParser(
         description="Generate a image or video from a text prompt or image using Wan"
     )
@@ -253,7 +253,7 @@ def _parse_args():
         help="Quantization type, must be 'int8' or 'fp8'."
     )
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     _validate_args(args)
 
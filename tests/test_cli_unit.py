@@ -4,9 +4,12 @@ from __future__ import annotations
 
 import importlib.util
 import os
+import subprocess
 import sys
+import time
 import wave
 from pathlib import Path
+from types import SimpleNamespace
 
 import pytest
 
@@ -31,12 +34,6 @@ cli = _load_module("multitalk_cli_for_tests", "cli.py")
 pytestmark = pytest.mark.unit
 
 
-def test_estimate_speech_duration_seconds() -> None:
-    assert cli._estimate_speech_duration_seconds("") is None
-    assert cli._estimate_speech_duration_seconds(None) is None
-    assert cli._estimate_speech_duration_seconds("a" * 30) == 2.0
-
-
 def test_estimate_audio_duration_seconds_for_wav_and_other_formats(tmp_path) -> None:
     wav_path = tmp_path / "sample.wav"
     with wave.open(str(wav_path), "wb") as handle:
@@ -58,6 +55,43 @@ def test_guess_audio_extension_prefers_url_path_then_content_type() -> None:
     assert cli._guess_audio_extension("https://example.com/audio", None) == ".bin"
 
 
+def test_download_audio_from_url_streams_body_to_disk(monkeypatch, tmp_path) -> None:
+    class FakeResponse:
+        headers = {"content-type": "audio/mpeg"}
+        closed = False
+
+        def raise_for_status(self):
+            return None
+
+        def iter_content(self, chunk_size):
+            yield b"abc"
+            yield b""
+            yield b"def"
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self.closed = True
+
+    response = FakeResponse()
+    captured = {}
+
+    def fake_get(url, **kwargs):
+        captured.update(kwargs, url=url)
+        return response
+
+    monkeypatch.setattr(cli, "_get_http_session", lambda: SimpleNamespace(get=fake_get))
+
+    path = cli._download_audio_from_url("https://example.com/voice", str(tmp_path))
+
+    assert captured["url"] == "https://example.com/voice"
+    assert captured["stream"] is True
+    assert path.startswith(str(tmp_path)) and path.endswith(".mp3")
+    assert open(path, "rb").read() == b"abcdef"
+    assert response.closed
+
+
 def test_resolve_voice_path_supports_name_file_and_explicit_path(tmp_path) -> None:
     base_dir = str(tmp_path)
     cli.config.TTS_VOICE = "weights/Kokoro-82M/voices/default.pt"
@@ -74,6 +108,62 @@ def test_resolve_voice_path_supports_name_file_and_explicit_path(tmp_path) -> No
     assert cli._resolve_voice_path("af.pt", base_dir) == os.path.join(base_dir, "af.pt")
 
 
+def test_ensure_kokoro_weights_links_once_and_keeps_existing_entry(monkeypatch, tmp_path) -> None:
+    kokoro_dir = tmp_path / "kokoro"
+    kokoro_dir.mkdir()
+    repo_dir = tmp_path / "repo"
+    repo_dir.mkdir()
+    monkeypatch.setattr(cli.config, "KOKORO_DIR", str(kokoro_dir))
+
+    cli._ensure_kokoro_weights(str(repo_dir))
+
+    link_path = repo_dir / "weights" / "Kokoro-82M"
+    assert os.readlink(link_path) == str(kokoro_dir)
+    assert (str(repo_dir), str(kokoro_dir)) in cli._kokoro_links_verified
+
+    other_repo = tmp_path / "other"
+    (other_repo / "weights" / "Kokoro-82M").mkdir(parents=True)
+    cli._ensure_kokoro_weights(str(other_repo))
+    assert not (other_repo / "weights" / "Kokoro-82M").is_symlink()
+
+    # Repeat calls for a known pair are answered from the process-level cache.
+    monkeypatch.setattr(cli.os, "symlink", lambda *_args: pytest.fail("symlink retried"))
+    cli._ensure_kokoro_weights(str(repo_dir))
+
+
+def test_ensure_kokoro_weights_leaves_dangling_link_in_place(monkeypatch, tmp_path) -> None:
+    repo_dir = tmp_path / "repo"
+    (repo_dir / "weights").mkdir(parents=True)
+    link_path = repo_dir / "weights" / "Kokoro-82M"
+    link_path.symlink_to(tmp_path / "gone")
+    monkeypatch.setattr(cli.config, "KOKORO_DIR", str(tmp_path / "kokoro"))
+
+    cli._ensure_kokoro_weights(str(repo_dir))
+
+    assert os.readlink(link_path) == str(tmp_path / "gone")
+
+
+def test_select_avatar_assets_picks_first_json_and_image_in_name_order(tmp_path) -> None:
+    (tmp_path / "a_dir.png").mkdir()
+    (tmp_path / "notes.txt").write_text("x", encoding="utf-8")
+    (tmp_path / "png").write_bytes(b"x")
+    (tmp_path / "a.png.bak").write_bytes(b"x")
+    (tmp_path / "b.json").write_text("{}", encoding="utf-8")
+    (tmp_path / "a.json").write_text("{}", encoding="utf-8")
+    (tmp_path / "face.JPG").write_bytes(b"x")
+    (tmp_path / "zz.png").write_bytes(b"x")
+
+    json_path, image_path = cli._select_avatar_assets(str(tmp_path))
+
+    assert json_path == os.path.join(str(tmp_path), "a.json")
+    assert image_path == os.path.join(str(tmp_path), "face.JPG")
+
+    (tmp_path / "face.JPG").unlink()
+    (tmp_path / "zz.png").unlink()
+    with pytest.raises(RuntimeError, match="one image file"):
+        cli._select_avatar_assets(str(tmp_path))
+
+
 def test_build_input_payload_requires_expected_keys(tmp_path) -> None:
     base_dir = str(tmp_path)
     payload = cli._build_input_payload(
@@ -120,6 +210,56 @@ def test_build_input_payload_uses_audio_file_when_present(tmp_path) -> None:
     assert "tts_audio" not in payload
 
 
+def test_write_json_and_load_json_round_trip(tmp_path) -> None:
+    path = tmp_path / "cond.json"
+    payload = {"prompt": "hi", "tts_audio": {"text": "h\u00e9llo", "human1_voice": "/v.pt"}}
+
+    cli._write_json(str(path), payload)
+
+    assert cli._load_json(str(path)) == payload
+
+    with pytest.raises(RuntimeError, match="Failed to read JSON"):
+        cli._load_json(str(tmp_path / "missing.json"))
+
+
+def test_encode_json_fallback_matches_compact_utf8_output(monkeypatch) -> None:
+    payload = {"text": "h\u00e9llo", "nested": {"n": 1, "f": 1.5, "xs": [True, None]}}
+    expected = '{"text":"h\u00e9llo","nested":{"n":1,"f":1.5,"xs":[true,null]}}'.encode("utf-8")
+
+    if cli.orjson is not None:
+        assert cli._encode_json(payload) == expected
+
+    monkeypatch.setattr(cli, "orjson", None)
+    assert cli._encode_json(payload) == expected
+
+
+def test_open_payload_fd_exposes_payload_through_dev_fd() -> None:
+    payload = {"prompt": "x" * (cli.PAYLOAD_PIPE_LIMIT + 1), "cond_audio": {}}
+
+    fd = cli._open_payload_fd(payload)
+    assert fd is not None
+    try:
+        with open(f"/dev/fd/{fd}", "r", encoding="utf-8") as handle:
+            assert cli.json.load(handle) == payload
+    finally:
+        os.close(fd)
+
+
+def test_open_payload_fd_pipe_fallback_is_size_limited(monkeypatch) -> None:
+    monkeypatch.delattr(cli.os, "memfd_create", raising=False)
+    payload = {"prompt": "hi", "cond_audio": {}}
+
+    fd = cli._open_payload_fd(payload)
+    assert fd is not None
+    try:
+        assert cli.json.loads(os.read(fd, 1 << 16)) == payload
+    finally:
+        os.close(fd)
+
+    too_big = {"prompt": "x" * (cli.PAYLOAD_PIPE_LIMIT + 1)}
+    assert cli._open_payload_fd(too_big) is None
+
+
 def test_resolve_input_audio_path_prefers_local_path_over_url(tmp_path) -> None:
     resolved = cli._resolve_input_audio_path(
         base_dir=str(tmp_path),
@@ -155,23 +295,211 @@ def test_resolve_input_audio_path_downloads_and_preprocesses_url(monkeypatch, tm
     assert resolved == os.path.join(str(tmp_path), "normalized.wav")
 
 
-def test_run_command_streaming_raises_with_tail_output(monkeypatch) -> None:
-    class FakeProc:
-        def __init__(self, rc, lines):
-            self.stdout = iter(lines)
-            self._rc = rc
+def test_run_command_streaming_raises_with_tail_output(tmp_path) -> None:
+    command = [
+        sys.executable,
+        "-c",
+        "import sys; print('line-1'); print('line-2'); sys.exit(1)",
+    ]
 
-        def wait(self):
-            return self._rc
+    with pytest.raises(RuntimeError, match="line-2"):
+        cli._run_command_streaming(command, cwd=str(tmp_path))
 
-    monkeypatch.setattr(
-        cli.subprocess,
-        "Popen",
-        lambda *args, **kwargs: FakeProc(1, ["line-1\n", "line-2\n"]),
+
+def test_run_command_streaming_drains_output_written_just_before_exit(monkeypatch, tmp_path) -> None:
+    real_selector = cli.selectors.DefaultSelector
+
+    class QuietOnceSelector(real_selector):
+        calls = 0
+
+        def select(self, timeout=None):
+            QuietOnceSelector.calls += 1
+            if QuietOnceSelector.calls == 1:
+                # Report an idle pipe while the child prints and exits.
+                time.sleep(0.5)
+                return []
+            return super().select(timeout)
+
+    monkeypatch.setattr(cli.selectors, "DefaultSelector", QuietOnceSelector)
+    command = [
+        sys.executable,
+        "-c",
+        "import sys; print('Traceback: CUDA OOM'); sys.exit(1)",
+    ]
+
+    with pytest.raises(RuntimeError, match="Traceback: CUDA OOM"):
+        cli._run_command_streaming(command, cwd=str(tmp_path))
+
+
+def test_run_command_streaming_bounds_tail_to_last_lines(tmp_path) -> None:
+    command = [
+        sys.executable,
+        "-c",
+        "import sys\nfor i in range(5000): print(f'progress-{i}')\nsys.exit(3)",
+    ]
+
+    with pytest.raises(RuntimeError) as excinfo:
+        cli._run_command_streaming(command, cwd=str(tmp_path))
+
+    message = str(excinfo.value)
+    assert "exit code 3" in message
+    assert message.rstrip().endswith("progress-4999")
+    assert "progress-4799\n" not in message
+    assert message.count("progress-") == cli.STREAM_TAIL_LINES
+
+
+def test_run_command_streaming_drops_partial_first_tail_line(tmp_path) -> None:
+    command = [
+        sys.executable,
+        "-c",
+        "import sys\nfor i in range(300): print(f'{i:03d}' + '\u00e9' * 500)\nsys.exit(1)",
+    ]
+
+    with pytest.raises(RuntimeError) as excinfo:
+        cli._run_command_streaming(command, cwd=str(tmp_path))
+
+    tail_lines = str(excinfo.value).split("Last output:\n", 1)[1].splitlines()
+    assert "\ufffd" not in "".join(tail_lines)
+    assert all(line.endswith("\u00e9" * 500) and len(line) == 503 for line in tail_lines)
+    assert tail_lines[-1].startswith("299")
+
+
+def test_run_command_streaming_kills_child_after_timeout(tmp_path) -> None:
+    command = [
+        sys.executable,
+        "-c",
+        "import time; print('started', flush=True); time.sleep(30)",
+    ]
+
+    with pytest.raises(RuntimeError, match="timed out after 0.5 seconds") as excinfo:
+        cli._run_command_streaming(command, cwd=str(tmp_path), timeout=0.5)
+
+    assert "started" in str(excinfo.value)
+
+
+def test_cleanup_work_dir_async_removes_directory_in_background(tmp_path) -> None:
+    work_dir = tmp_path / "work"
+    (work_dir / "audio").mkdir(parents=True)
+    (work_dir / "audio" / "chunk.wav").write_bytes(b"x")
+
+    cli._cleanup_work_dir_async(str(work_dir))
+
+    assert not work_dir.exists()
+    deadline = time.monotonic() + 10
+    while any(tmp_path.iterdir()) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not any(tmp_path.iterdir())
+
+
+def test_cleanup_work_dir_async_leaves_recreated_work_dir_alone(tmp_path) -> None:
+    work_dir = tmp_path / "work"
+    (work_dir / "audio").mkdir(parents=True)
+    (work_dir / "audio" / "old.wav").write_bytes(b"x")
+
+    cli._cleanup_work_dir_async(str(work_dir))
+    (work_dir / "audio").mkdir(parents=True)
+    (work_dir / "audio" / "downloaded.wav").write_bytes(b"y")
+
+    deadline = time.monotonic() + 10
+    while len(list(tmp_path.iterdir())) > 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [path.name for path in tmp_path.iterdir()] == ["work"]
+    assert (work_dir / "audio" / "downloaded.wav").read_bytes() == b"y"
+    assert not (work_dir / "audio" / "old.wav").exists()
+
+
+def test_cleanup_work_dir_async_detaches_helper_from_wrapper_stdio(monkeypatch, tmp_path) -> None:
+    captured = {}
+
+    def fake_popen(command, **kwargs):
+        captured["command"] = command
+        captured["kwargs"] = kwargs
+
+    monkeypatch.setattr(cli.subprocess, "Popen", fake_popen)
+    (tmp_path / "work").mkdir()
+
+    cli._cleanup_work_dir_async(str(tmp_path / "work"))
+
+    assert captured["command"][0] == sys.executable
+    assert captured["command"][-1].startswith(str(tmp_path / "work") + ".deleting-")
+    for stream in ("stdin", "stdout", "stderr"):
+        assert captured["kwargs"][stream] is subprocess.DEVNULL
+    assert captured["kwargs"]["start_new_session"] is True
+    assert captured["kwargs"]["close_fds"] is True
+
+
+def test_cleanup_work_dir_async_falls_back_to_inline_rmtree_when_spawn_fails(monkeypatch, tmp_path) -> None:
+    work_dir = tmp_path / "work"
+    work_dir.mkdir()
+
+    def failing_popen(*_args, **_kwargs):
+        raise OSError("EAGAIN")
+
+    monkeypatch.setattr(cli.subprocess, "Popen", failing_popen)
+
+    cli._cleanup_work_dir_async(str(work_dir))
+
+    assert not work_dir.exists()
+
+
+def test_get_parser_is_built_once_and_parses_wrapper_flags() -> None:
+    parser = cli._get_parser()
+    assert cli._get_parser() is parser
+
+    args = parser.parse_args(
+        ["--job-id", "j", "--output", "o.mp4", "--data", "d.json", "--timeout", "90"]
     )
+    assert args.job_id == "j"
+    assert args.timeout == 90.0
+    assert args.audio is None and args.work_dir is None
 
-    with pytest.raises(RuntimeError, match="line-2"):
-        cli._run_command_streaming(["fake"], cwd="/")
+
+def test_get_parser_rejects_non_positive_timeout() -> None:
+    parser = cli._get_parser()
+    for value in ("0", "-5", "nan", "inf", "soon"):
+        with pytest.raises(SystemExit):
+            parser.parse_args(
+                ["--job-id", "j", "--output", "o.mp4", "--data", "d.json", "--timeout", value]
+            )
+
+
+def test_run_generator_in_process_parses_command_and_runs_in_cwd(monkeypatch, tmp_path) -> None:
+    captured = {}
+
+    def fake_parse_args(argv):
+        captured["argv"] = argv
+        return SimpleNamespace(argv=argv)
+
+    def fake_generate(args):
+        captured["cwd"] = os.getcwd()
+        captured["args"] = args
+
+    monkeypatch.setitem(
+        sys.modules,
+        "generate_multitalk",
+        SimpleNamespace(_parse_args=fake_parse_args, generate=fake_generate),
+    )
+    previous_cwd = os.getcwd()
+
+    cli._run_generator_in_process(
+        [sys.executable, "generate_multitalk.py", "--frame_num", "33"], cwd=str(tmp_path)
+    )
+
+    assert captured["argv"] == ["--frame_num", "33"]
+    assert captured["cwd"] == str(tmp_path)
+    assert os.getcwd() == previous_cwd
+
+    def failing_generate(args):
+        raise ValueError("boom")
+
+    monkeypatch.setitem(
+        sys.modules,
+        "generate_multitalk",
+        SimpleNamespace(_parse_args=fake_parse_args, generate=failing_generate),
+    )
+    with pytest.raises(RuntimeError, match="boom"):
+        cli._run_generator_in_process([sys.executable, "g.py"], cwd=str(tmp_path))
+    assert os.getcwd() == previous_cwd
 
 
 def test_main_builds_expected_command_and_cleans_workdir(monkeypatch, tmp_path) -> None:
@@ -206,12 +534,13 @@ def test_main_builds_expected_command_and_cleans_workdir(monkeypatch, tmp_path)
     monkeypatch.setattr(
         cli,
         "_run_command_streaming",
-        lambda command, cwd: captured.update({"command": command, "cwd": cwd}),
+        lambda command, cwd, **_kwargs: captured.update({"command": command, "cwd": cwd}),
     )
+    monkeypatch.setattr(cli, "_open_payload_fd", lambda payload: None)
     monkeypatch.setattr(cli, "_ensure_kokoro_weights", lambda _repo_dir: None)
     monkeypatch.setattr(
-        cli.shutil,
-        "rmtree",
+        cli,
+        "_cleanup_work_dir_async",
         lambda path: captured.update({"cleanup_path": path}),
     )
 
@@ -282,14 +611,15 @@ def test_main_uses_local_audio_mode_when_audio_file_is_supplied(monkeypatch, tmp
     monkeypatch.setattr(
         cli,
         "_run_command_streaming",
-        lambda command, cwd: captured.update({"command": command, "cwd": cwd}),
+        lambda command, cwd, **_kwargs: captured.update({"command": command, "cwd": cwd}),
     )
+    monkeypatch.setattr(cli, "_open_payload_fd", lambda payload: None)
     monkeypatch.setattr(
         cli,
         "_ensure_kokoro_weights",
         lambda _repo_dir: captured.update({"ensure_called": True}),
     )
-    monkeypatch.setattr(cli.shutil, "rmtree", lambda path: None)
+    monkeypatch.setattr(cli, "_cleanup_work_dir_async", lambda path: None)
 
     output_path = tmp_path / "output.mp4"
     data_path = tmp_path / "data.json"
@@ -359,10 +689,11 @@ def test_main_uses_audio_url_when_provided(monkeypatch, tmp_path) -> None:
     monkeypatch.setattr(
         cli,
         "_run_command_streaming",
-        lambda command, cwd: captured.update({"command": command, "cwd": cwd}),
+        lambda command, cwd, **_kwargs: captured.update({"command": command, "cwd": cwd}),
     )
+    monkeypatch.setattr(cli, "_open_payload_fd", lambda payload: None)
     monkeypatch.setattr(cli, "_ensure_kokoro_weights", lambda _repo_dir: None)
-    monkeypatch.setattr(cli.shutil, "rmtree", lambda path: None)
+    monkeypatch.setattr(cli, "_cleanup_work_dir_async", lambda path: None)
 
     output_path = tmp_path / "output.mp4"
     data_path = tmp_path / "data.json"
@@ -426,10 +757,11 @@ def test_main_adds_fusionx_lora_flags_without_audio_guide_override(monkeypatch,
     monkeypatch.setattr(
         cli,
         "_run_command_streaming",
-        lambda command, cwd: captured.update({"command": command, "cwd": cwd}),
+        lambda command, cwd, **_kwargs: captured.update({"command": command, "cwd": cwd}),
     )
+    monkeypatch.setattr(cli, "_open_payload_fd", lambda payload: None)
     monkeypatch.setattr(cli, "_ensure_kokoro_weights", lambda _repo_dir: None)
-    monkeypatch.setattr(cli.shutil, "rmtree", lambda path: None)
+    monkeypatch.setattr(cli, "_cleanup_work_dir_async", lambda path: None)
 
     output_path = tmp_path / "output.mp4"
     data_path = tmp_path / "data.json"
@@ -460,3 +792,65 @@ def test_main_adds_fusionx_lora_flags_without_audio_guide_override(monkeypatch,
     assert command[command.index("--sample_shift") + 1] == "2.0"
     assert command[command.index("--sample_text_guide_scale") + 1] == "1.0"
     assert "--sample_audio_guide_scale" not in command
+
+
+def test_main_runs_generator_in_process_when_requested(monkeypatch, tmp_path) -> None:
+    ckpt_dir = tmp_path / "ckpt"
+    wav2vec_dir = tmp_path / "wav2vec"
+    ckpt_dir.mkdir()
+    wav2vec_dir.mkdir()
+
+    monkeypatch.setattr(cli.config, "CKPT_DIR", str(ckpt_dir))
+    monkeypatch.setattr(cli.config, "WAV2VEC_DIR", str(wav2vec_dir))
+    monkeypatch.setattr(cli.config, "LORA_DIR", "")
+    monkeypatch.setattr(
+        cli,
+        "_load_json",
+        lambda _path: {
+            "speech_text": "hello" * 50,
+            "kokoro_voice": "af_heart",
+            "avatar_path": "avatar.png",
+        },
+    )
+
+    captured = {"command": None}
+
+    monkeypatch.setattr(cli, "_open_payload_fd", lambda payload: None)
+    monkeypatch.setattr(cli, "_write_json", lambda path, payload: None)
+    monkeypatch.setattr(
+        cli,
+        "_run_command_streaming",
+        lambda *args, **kwargs: pytest.fail("subprocess path used"),
+    )
+    monkeypatch.setattr(
+        cli,
+        "_run_generator_in_process",
+        lambda command, cwd: captured.update({"command": command, "cwd": cwd}),
+    )
+    monkeypatch.setattr(cli, "_ensure_kokoro_weights", lambda _repo_dir: None)
+    monkeypatch.setattr(cli, "_cleanup_work_dir_async", lambda path: None)
+
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "cli.py",
+            "--job-id",
+            "job123",
+            "--output",
+            str(tmp_path / "output.mp4"),
+            "--data",
+            str(tmp_path / "data.json"),
+            "--work-dir",
+            str(tmp_path / "work"),
+            "--in-process",
+        ],
+    )
+
+    cli.main()
+
+    command = captured["command"]
+    assert command[1].endswith("generate_multitalk.py")
+    assert command[command.index("--input_json") + 1] == os.path.join(
+        str(tmp_path / "work"), "cond.json"
+    )